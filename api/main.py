@@ -1,6 +1,9 @@
-from fastapi import FastAPI, HTTPException, Path, status, Response
+from fastapi import FastAPI, HTTPException, Path, status, Response, Request
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
 from typing import List, Optional
+import os
+import sys
 import psycopg2
 from psycopg2 import IntegrityError
 from psycopg2.extras import RealDictCursor
@@ -22,6 +25,44 @@ DATABASE_CONFIG = {
     "port": "5432"
 }
 
+# Latency instrumentation shared with the assistant (src/tracing.py): one span per
+# HTTP request and per database query, summarized as histograms on /metrics, with
+# sampled traces appended to API_TRACE_FILE by a background thread. Requests from
+# the assistant carry X-Trace-Id / X-Parent-Span-Id / X-Trace-Sampled so these
+# spans join the chat turn's trace and follow its sampling decision.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+from config import TRACE_SAMPLE_RATE
+from tracing import JsonLinesExporter, Tracer
+
+# Finer buckets than the assistant's: most requests are a single indexed query
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+tracer = Tracer(exporters=[JsonLinesExporter(os.getenv("API_TRACE_FILE", "api_traces.jsonl"))],
+                sample_rate=TRACE_SAMPLE_RATE, buckets=LATENCY_BUCKETS)
+
+def execute(cursor, query, params=None):
+    """Run a query on cursor as a child span of the current request."""
+    with tracer.span(f"db {query.split(None, 1)[0].upper()}") as span:
+        cursor.execute(query, params)
+        span.set("rows", cursor.rowcount)
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    if request.url.path == "/metrics":
+        return await call_next(request)
+    with tracer.span("http", parent=tracer.extract(request.headers)) as span:
+        try:
+            response = await call_next(request)
+            span.set("status_code", response.status_code)
+            return response
+        finally:
+            route = request.scope.get("route")
+            # Unrouted paths share one name, so arbitrary URLs cannot grow the histograms
+            span.name = f"http {request.method} {route.path}" if route else "http unmatched"
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics():
+    return tracer.prometheus()
+
 # Pydantic model for Client Engagement
 class ClientEngagement(BaseModel):
     client_id: int
@@ -71,7 +112,7 @@ def get_client_engagements():
     conn = get_db_connection()
     cursor = conn.cursor()
     try:
-        cursor.execute("SELECT * FROM client_engagement;")
+        execute(cursor, "SELECT * FROM client_engagement;")
         records = cursor.fetchall()
         return records
     except Exception as e:
@@ -94,7 +135,7 @@ def get_client_engagement(
     conn = get_db_connection()
     cursor = conn.cursor()
     try:
-        cursor.execute("SELECT * FROM client_engagement WHERE client_id = %s;", (client_id,))
+        execute(cursor, "SELECT * FROM client_engagement WHERE client_id = %s;", (client_id,))
         record = cursor.fetchone()
         if record:
             return ClientEngagement.parse_obj(record)
@@ -142,7 +183,8 @@ def create_client_engagement(client: ClientEngagementCreate):
     conn = get_db_connection()
     cursor = conn.cursor()
     try:
-        cursor.execute(
+        execute(
+            cursor,
             """
             INSERT INTO client_engagement (
                 client_name, contact_email, contact_phone, 
@@ -209,7 +251,7 @@ def update_client_engagement(
             WHERE client_id = %s
             RETURNING *;
         """
-        cursor.execute(query, values)
+        execute(cursor, query, values)
         updated_client = cursor.fetchone()
         
         if not updated_client:
@@ -250,7 +292,8 @@ def delete_client_engagement(
     conn = get_db_connection()
     cursor = conn.cursor()
     try:
-        cursor.execute(
+        execute(
+            cursor,
             "DELETE FROM client_engagement WHERE client_id = %s RETURNING *;",
             (client_id,)
         )
@@ -0,0 +1,326 @@
+"""
+Local stand-ins for the services the assistant talks to, so benchmarks run offline:
+a fake Ollama server, a static OpenAPI spec server, a stubbed Open-Meteo client
+and a SQLite connection that stands in for Postgres in api/main.py.
+"""
+import re
+import json
+import math
+import time
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+# Must match the VectorParams size of the Qdrant collection in endpoint.py
+EMBED_DIM = 3072
+
+def embed_text(text, dim=EMBED_DIM):
+    """Deterministic bag-of-words embedding: similar texts share hashed dimensions."""
+    vector = [0.0] * dim
+    for token in re.findall(r"[a-z0-9]+", text.lower()):
+        digest = hashlib.sha256(token.encode()).digest()
+        index = int.from_bytes(digest[:4], "little") % dim
+        vector[index] += 1.0 if digest[4] & 1 else -1.0
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+def _start(handler_cls):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler_cls)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+class _JSONHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_ndjson(self, chunks):
+        body = b"".join(json.dumps(chunk).encode() + b"\n" for chunk in chunks)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+class FakeOllama:
+    """
+    Minimal Ollama server for /api/embed, /api/embeddings, /api/chat and /api/generate.
+    Every request sleeps latency seconds (plus embed_latency per embedded text).
+    Chat answers the first user turn with a get_apidoc tool call and the tool result
+    with a short summary; generate returns an API plan for the endpoint in the prompt.
+    """
+    def __init__(self, latency=0.0, embed_latency=0.0):
+        self.latency = latency
+        self.embed_latency = embed_latency
+        self.requests = 0
+        self._lock = threading.Lock()
+        self.server = None
+        self.url = None
+
+    def start(self):
+        fake = self
+
+        class Handler(_JSONHandler):
+            def do_POST(self):
+                with fake._lock:
+                    fake.requests += 1
+                body = self._read_json()
+                route = {
+                    "/api/embed": fake._embed,
+                    "/api/embeddings": fake._embeddings,
+                    "/api/chat": fake._chat,
+                    "/api/generate": fake._generate,
+                }.get(self.path)
+                if route is None:
+                    self._send_json({"error": f"unknown path {self.path}"}, 404)
+                    return
+                chunks = route(body)
+                if body.get("stream", True) and self.path in ("/api/chat", "/api/generate"):
+                    self._send_ndjson(chunks)
+                else:
+                    self._send_json(_merge(chunks))
+
+        self.server, self.url = _start(Handler)
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+
+    def _done(self, body, prompt, output):
+        return {
+            "model": body.get("model", ""),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "done": True,
+            "done_reason": "stop",
+            "total_duration": 0,
+            "prompt_eval_count": len(prompt.split()),
+            "eval_count": len(output.split()),
+        }
+
+    def _embed(self, body):
+        texts = body.get("input", [])
+        texts = [texts] if isinstance(texts, str) else texts
+        time.sleep(self.latency + self.embed_latency * len(texts))
+        return [{"model": body.get("model", ""), "embeddings": [embed_text(text) for text in texts]}]
+
+    def _embeddings(self, body):
+        time.sleep(self.latency + self.embed_latency)
+        return [{"embedding": embed_text(body.get("prompt", ""))}]
+
+    def _chat(self, body):
+        time.sleep(self.latency)
+        messages = body.get("messages", [])
+        prompt = " ".join(str(message.get("content", "")) for message in messages)
+        message = {"role": "assistant", "content": ""}
+        if messages and messages[-1].get("role") == "tool":
+            message["content"] = f"Here is what the API returned: {messages[-1].get('content', '')[:200]}"
+        else:
+            user = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+            message["tool_calls"] = [{"function": {"name": "get_apidoc", "arguments": {"user_query": user}}}]
+        chunk = {"model": body.get("model", ""), "created_at": datetime.now(timezone.utc).isoformat(),
+                 "message": message, "done": False}
+        done = dict(self._done(body, prompt, message["content"]), message={"role": "assistant", "content": ""})
+        return [chunk, done]
+
+    def _generate(self, body):
+        time.sleep(self.latency)
+        prompt = body.get("prompt", "")
+        path = re.search(r"'path': '([^']+)'", prompt)
+        method = re.search(r"'method': '([^']+)'", prompt)
+        plan = json.dumps({
+            "endpoint": re.sub(r"\{[^}]+\}", "1", path.group(1)) if path else None,
+            "method": method.group(1) if method else None,
+            "parameters": {},
+            "description": "Generated by the fake Ollama server.",
+        })
+        chunk = {"model": body.get("model", ""), "created_at": datetime.now(timezone.utc).isoformat(),
+                 "response": plan, "done": False}
+        return [chunk, dict(self._done(body, prompt, plan), response="")]
+
+def _merge(chunks):
+    """Collapse a streamed reply into the single object Ollama returns for stream=false."""
+    merged = dict(chunks[-1])
+    if "response" in chunks[0]:
+        merged["response"] = "".join(chunk.get("response", "") for chunk in chunks)
+    if "message" in chunks[0]:
+        merged["message"] = chunks[0]["message"]
+    return merged
+
+class SpecServer:
+    """Serve a fixed OpenAPI document at /openapi.json."""
+    def __init__(self, spec):
+        self.spec = spec
+        self.server = None
+        self.url = None
+
+    def start(self):
+        spec = self.spec
+
+        class Handler(_JSONHandler):
+            def do_GET(self):
+                if self.path != "/openapi.json":
+                    self._send_json({"detail": "Not Found"}, 404)
+                    return
+                self._send_json(spec)
+
+        self.server, self.url = _start(Handler)
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+
+def replicate_spec(spec, copies):
+    """
+    Return spec with every path repeated copies times under /v<i>, for larger indexing runs.
+    Each copy's summary and operationId carry its index, so the gateway embeds every copy
+    instead of coalescing identical texts.
+    """
+    paths = {}
+    for i in range(copies):
+        for path, methods in spec.get("paths", {}).items():
+            paths[f"/v{i}{path}"] = {
+                method: dict(operation, summary=f"{operation.get('summary', '')} (copy {i})",
+                             operationId=f"{operation.get('operationId', method)}_v{i}")
+                for method, operation in methods.items()
+            }
+    return dict(spec, paths=paths)
+
+class _Variable:
+    def __init__(self, values):
+        self._values = values
+
+    def ValuesAsNumpy(self):
+        return self._values
+
+class _Hourly:
+    def __init__(self, start, hours, variables):
+        self._start = start
+        self._hours = hours
+        self._variables = variables
+
+    def Time(self):
+        return self._start
+
+    def TimeEnd(self):
+        return self._start + self._hours * 3600
+
+    def Interval(self):
+        return 3600
+
+    def Variables(self, index):
+        return _Variable(self._variables[index])
+
+class _WeatherResponse:
+    def __init__(self, hourly):
+        self._hourly = hourly
+
+    def Hourly(self):
+        return self._hourly
+
+class FakeOpenMeteo:
+    """Drop-in for openmeteo_requests.Client returning a deterministic hourly forecast."""
+    def __init__(self, hours=168, latency=0.0):
+        self.hours = hours
+        self.latency = latency
+
+    def weather_api(self, url, params):
+        time.sleep(self.latency)
+        seed = int(abs(params["latitude"] * 1000 + params["longitude"]))
+        rng = np.random.default_rng(seed)
+        start = int(datetime(2025, 1, 1, tzinfo=timezone.utc).timestamp())
+        variables = [rng.uniform(0, 100, self.hours).astype(np.float32) for _ in params["hourly"]]
+        return [_WeatherResponse(_Hourly(start, self.hours, variables))]
+
+CLIENT_ENGAGEMENT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS client_engagement (
+    client_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    client_name TEXT NOT NULL,
+    contact_email TEXT NOT NULL,
+    contact_phone TEXT NOT NULL,
+    signup_date DATE NOT NULL,
+    engagement_type TEXT NOT NULL,
+    engagement_status TEXT NOT NULL,
+    last_meeting_date DATE NOT NULL,
+    feedback_rating INTEGER NOT NULL,
+    notes TEXT NOT NULL
+)
+"""
+
+class SqliteCursor:
+    """psycopg2 RealDictCursor look-alike: %s placeholders, rows as dicts."""
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def execute(self, query, params=None):
+        self._cursor.execute(query.replace("%s", "?"), tuple(params or ()))
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        return dict(row) if row is not None else None
+
+    def fetchall(self):
+        return [dict(row) for row in self._cursor.fetchall()]
+
+    def close(self):
+        self._cursor.close()
+
+class SqliteConnection:
+    def __init__(self, path):
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+
+    def cursor(self):
+        return SqliteCursor(self._conn.cursor())
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        self._conn.close()
+
+def create_sqlite_database(path, rows=100):
+    """Create the client_engagement table in a SQLite file and seed it with rows records."""
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(CLIENT_ENGAGEMENT_SCHEMA)
+    conn.executemany(
+        """
+        INSERT INTO client_engagement (
+            client_name, contact_email, contact_phone, signup_date, engagement_type,
+            engagement_status, last_meeting_date, feedback_rating, notes
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        [
+            (f"Client {i}", f"client{i}@example.com", "123-456-7890", "2023-10-10", "Consultation",
+             "Active", "2023-10-01", i % 5 + 1, "Seeded for benchmarks.")
+            for i in range(rows)
+        ],
+    )
+    conn.commit()
+    conn.close()
+    return lambda: SqliteConnection(path)
@@ -0,0 +1,306 @@
+"""
+Offline benchmark suite for the assistant.
+
+Starts a fake Ollama server, serves api/main.py from uvicorn on a SQLite stand-in,
+points Qdrant at an in-memory store and stubs Open-Meteo, then measures indexing
+throughput, get_apidoc latency, API CRUD throughput under concurrency, end-to-end
+graph turns and the weather tool. Results are written as JSON; pass --compare with
+an earlier results file to flag regressions.
+
+It needs the app's dependencies plus the "bench" extra from src/pyproject.toml
+(fastapi, uvicorn and psycopg2, which api/main.py imports even though the
+benchmark swaps Postgres for SQLite). From the repository root:
+
+    uv sync --project src --extra bench
+    uv run --project src --extra bench python benchmarks/run.py --output results.json
+    uv run --project src --extra bench python benchmarks/run.py --compare results.json --ollama-latency 0.05
+
+No network access is needed once the dependencies are installed.
+"""
+import os
+import sys
+import json
+import time
+import random
+import socket
+import logging
+import argparse
+import tempfile
+import importlib.util
+import statistics
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import requests
+from qdrant_client.http.models import VectorParams
+
+from fakes import EMBED_DIM, FakeOllama, FakeOpenMeteo, SpecServer, create_sqlite_database, replicate_spec
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+QUERIES = [
+    "Get all client engagements",
+    "Show me the client engagement with ID 1",
+    "List every client and their engagement status",
+    "Fetch client engagement 1 details",
+]
+
+def summarize(latencies, wall_time=None):
+    """Latency percentiles in milliseconds, plus throughput when the wall time is known."""
+    ordered = sorted(latencies)
+    result = {
+        "count": len(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1000 if ordered else 0.0,
+        "p50_ms": _percentile(ordered, 0.50) * 1000,
+        "p99_ms": _percentile(ordered, 0.99) * 1000,
+        "max_ms": ordered[-1] * 1000 if ordered else 0.0,
+    }
+    if wall_time:
+        result["ops_per_s"] = len(ordered) / wall_time
+    return result
+
+def _percentile(ordered, fraction):
+    if not ordered:
+        return 0.0
+    return ordered[min(int(round(fraction * (len(ordered) - 1))), len(ordered) - 1)]
+
+def run_concurrent(fn, items, concurrency):
+    """Call fn(item) for every item on concurrency threads; return per-call latencies and wall time."""
+    def timed(item):
+        start = time.perf_counter()
+        fn(item)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(timed, items))
+    return latencies, time.perf_counter() - start
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_api(db_path, rows, port):
+    """Serve api/main.py with uvicorn on port, backed by a seeded SQLite database."""
+    import uvicorn
+
+    spec = importlib.util.spec_from_file_location("api_main", os.path.join(ROOT, "api", "main.py"))
+    api_main = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(api_main)
+    api_main.get_db_connection = create_sqlite_database(db_path, rows)
+
+    server = uvicorn.Server(uvicorn.Config(api_main.app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while not server.started:
+        if time.monotonic() > deadline:
+            raise RuntimeError("API server did not start")
+        time.sleep(0.05)
+    return server, url
+
+def bench_indexing(endpoint, gateway, spec, copies, rounds):
+    spec_server = SpecServer(replicate_spec(spec, copies)).start()
+    try:
+        endpoints = sum(len(methods) for methods in spec.get("paths", {}).values()) * copies
+        embedded = gateway.stats()["embedding"]["embedded"]
+        latencies = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            endpoint.index_endpoints_from_url(f"{spec_server.url}/openapi.json")
+            latencies.append(time.perf_counter() - start)
+        embedded = gateway.stats()["embedding"]["embedded"] - embedded
+    finally:
+        spec_server.stop()
+    # Re-index the real spec so later benchmarks search the API that is actually served
+    endpoint.qdrant.delete_collection(endpoint.QDRANT_COLLECTION)
+    endpoint.qdrant.create_collection(
+        collection_name=endpoint.QDRANT_COLLECTION,
+        vectors_config=VectorParams(size=EMBED_DIM, distance="Cosine"),
+    )
+    endpoint.index_endpoints_from_url(f"{endpoint.BASE_URL}/openapi.json")
+
+    result = summarize(latencies)
+    result["endpoints"] = endpoints
+    result["endpoints_per_s"] = endpoints * len(latencies) / sum(latencies)
+    # Texts actually sent to the model; below endpoints * rounds when the gateway coalesced duplicates
+    result["embedded"] = embedded
+    return result
+
+def bench_get_apidoc(endpoint, iterations, concurrency):
+    queries = [QUERIES[i % len(QUERIES)] for i in range(iterations)]
+    latencies, wall_time = run_concurrent(
+        lambda query: endpoint.get_apidoc.invoke({"user_query": query}), queries, concurrency)
+    return summarize(latencies, wall_time)
+
+def bench_api_crud(api_url, iterations, concurrency):
+    sessions = threading.local()
+    record = {
+        "client_name": "Bench Client",
+        "contact_email": "bench@example.com",
+        "contact_phone": "000-000-0000",
+        "signup_date": "2024-01-01",
+        "engagement_type": "Consultation",
+        "engagement_status": "Active",
+        "last_meeting_date": "2024-01-02",
+        "feedback_rating": 5,
+        "notes": "Created by the benchmark.",
+    }
+    operations = {name: [] for name in ("create", "read", "update", "list", "delete")}
+    lock = threading.Lock()
+
+    def session():
+        if not hasattr(sessions, "session"):
+            sessions.session = requests.Session()
+        return sessions.session
+
+    def timed(name, fn):
+        start = time.perf_counter()
+        response = fn()
+        response.raise_for_status()
+        with lock:
+            operations[name].append(time.perf_counter() - start)
+        return response
+
+    def cycle(_):
+        created = timed("create", lambda: session().post(f"{api_url}/client-engagements", json=record)).json()
+        item = f"{api_url}/client-engagements/{created['client_id']}"
+        timed("read", lambda: session().get(item))
+        timed("update", lambda: session().put(item, json={"engagement_status": "Closed"}))
+        timed("list", lambda: session().get(f"{api_url}/client-engagements"))
+        timed("delete", lambda: session().delete(item))
+
+    _, wall_time = run_concurrent(cycle, range(iterations), concurrency)
+    result = {name: summarize(latencies) for name, latencies in operations.items()}
+    result["ops_per_s"] = sum(len(latencies) for latencies in operations.values()) / wall_time
+    result["concurrency"] = concurrency
+    return result
+
+def bench_graph_turns(app, iterations, concurrency):
+    from langchain_core.messages import HumanMessage, SystemMessage
+
+    def turn(query):
+        app.compiled_graph.invoke({"messages": [
+            SystemMessage(content="You are an expert in retrieving API documentation. Use the get_apidoc tool to search the vector store, and return the formatted data from executed api endpoint."),
+            HumanMessage(content=query),
+        ]})
+
+    queries = [QUERIES[i % len(QUERIES)] for i in range(iterations)]
+    latencies, wall_time = run_concurrent(turn, queries, concurrency)
+    return summarize(latencies, wall_time)
+
+def bench_weather(weather, iterations):
+    weather.openmeteo = FakeOpenMeteo()
+    latencies = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        weather.get_weather.invoke({"lat": 37.7749 + i, "lon": -122.4194})
+        latencies.append(time.perf_counter() - start)
+    return summarize(latencies)
+
+def _flatten(results, prefix=""):
+    for key, value in results.items():
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{prefix}{key}.")
+        elif isinstance(value, (int, float)):
+            yield f"{prefix}{key}", value
+
+def compare(current, baseline, threshold):
+    """Print metrics that moved more than threshold against baseline; return the regressions."""
+    previous = dict(_flatten(baseline["results"]))
+    regressions = []
+    for name, value in _flatten(current["results"]):
+        old = previous.get(name)
+        if not old or not (name.endswith("_ms") or name.endswith("_per_s")):
+            continue
+        change = (value - old) / old
+        # Latencies regress when they grow, throughputs when they shrink
+        worse = change > threshold if name.endswith("_ms") else change < -threshold
+        if worse or abs(change) > threshold:
+            print(f"{'REGRESSION' if worse else 'improved':>10}  {name}: {old:.2f} -> {value:.2f} ({change:+.1%})")
+        if worse:
+            regressions.append(name)
+    return regressions
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default=None, help="results file (default: bench-<timestamp>.json)")
+    parser.add_argument("--compare", default=None, help="earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative change counted as a regression")
+    parser.add_argument("--ollama-latency", type=float, default=0.0, help="seconds added to every fake Ollama call")
+    parser.add_argument("--embed-latency", type=float, default=0.0, help="seconds added per embedded text")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--spec-copies", type=int, default=20, help="times the API spec is repeated for indexing")
+    parser.add_argument("--rows", type=int, default=1000, help="rows seeded into the SQLite stand-in")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    logging.basicConfig(level=logging.WARNING)
+    output = os.path.abspath(args.output or f"bench-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    workdir = tempfile.mkdtemp(prefix="bench-")
+    # Trace files, the weather cache and chainlit's config land in the scratch directory
+    os.chdir(workdir)
+
+    ollama = FakeOllama(latency=args.ollama_latency, embed_latency=args.embed_latency).start()
+    api_port = _free_port()
+
+    # Point the assistant at the stand-ins before config is read (api/main.py imports it too)
+    os.environ.update({
+        "BASE_URL": f"http://127.0.0.1:{api_port}",
+        "OLLAMA_BASE_URL": ollama.url,
+        "QDRANT_URL": ":memory:",
+        "METRICS_PORT": str(_free_port()),
+    })
+    api_server, api_url = start_api("client_engagement.db", args.rows, api_port)
+    sys.path.insert(0, os.path.join(ROOT, "src"))
+    import endpoint
+    import weather
+    import app
+    from llm_utils import request_cache
+    from model_gateway import gateway
+
+    spec = requests.get(f"{api_url}/openapi.json").json()
+    results = {
+        "indexing": bench_indexing(endpoint, gateway, spec, args.spec_copies, rounds=3),
+        "get_apidoc": bench_get_apidoc(endpoint, args.iterations, args.concurrency),
+        "api_crud": bench_api_crud(api_url, args.iterations, args.concurrency),
+        "graph_turns": bench_graph_turns(app, args.iterations, args.concurrency),
+        "weather": bench_weather(weather, args.iterations),
+    }
+    results["model_gateway"] = gateway.stats()
+    results["request_cache"] = request_cache.stats()
+
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": _git_commit(),
+        "config": vars(args),
+        "fake_ollama_requests": ollama.requests,
+        "results": results,
+    }
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(results, indent=2))
+    print(f"Wrote {output}")
+
+    api_server.should_exit = True
+    ollama.stop()
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.threshold):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
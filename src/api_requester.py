@@ -1,20 +1,33 @@
 import requests
+from config import API_TIMEOUT
+from tracing import tracer
 
 class APIRequester:
-    def __init__(self, base_url="http://127.0.0.1:8000"):
+    def __init__(self, base_url="http://127.0.0.1:8000", timeout=API_TIMEOUT):
         self.base_url = base_url
+        self.timeout = timeout
 
-    def get(self, url, params=None):
-        return requests.get(url, params=params)
+    def _headers(self, headers=None):
+        # Let the backend attach its spans to the current trace
+        headers = dict(headers or {})
+        span = tracer.current_span()
+        if span:
+            headers["X-Trace-Id"] = span.trace_id
+            headers["X-Parent-Span-Id"] = span.span_id
+            headers["X-Trace-Sampled"] = "1" if span.sampled else "0"
+        return headers
+
+    def get(self, url, params=None, headers=None):
+        return requests.get(url, params=params, headers=self._headers(headers), timeout=self.timeout)
 
     def post(self, url, json=None):
-        return requests.post(url, json=json)
+        return requests.post(url, json=json, headers=self._headers(), timeout=self.timeout)
 
     def put(self, url, json=None):
-        return requests.put(url, json=json)
+        return requests.put(url, json=json, headers=self._headers(), timeout=self.timeout)
 
     def patch(self, url, json=None):
-        return requests.patch(url, json=json)
+        return requests.patch(url, json=json, headers=self._headers(), timeout=self.timeout)
 
     def delete(self, url, json=None):
-        return requests.delete(url, json=json)
+        return requests.delete(url, json=json, headers=self._headers(), timeout=self.timeout)
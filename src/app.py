@@ -1,3 +1,4 @@
+import re
 from typing import Literal, Annotated
 from typing_extensions import TypedDict
 
@@ -5,13 +6,16 @@ import logging
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)#,filename="app.log")
 
+from dotenv import load_dotenv
+load_dotenv()  # before the imports below read config
+
 from endpoint import get_apidoc
-from langchain_ollama import ChatOllama
+from model_gateway import Priority, chat_model, gateway
+from llm_utils import request_cache
+from tracing import tracer
+from config import METRICS_PORT
 from langchain_core.messages import HumanMessage, SystemMessage
 
-from dotenv import load_dotenv
-load_dotenv()
-
 from langgraph.prebuilt import ToolNode
 from langgraph.graph.message import add_messages
 from langgraph.graph import StateGraph, START, END
@@ -22,17 +26,27 @@ class State(TypedDict):
     messages: Annotated[list,add_messages]
 
 tool_belt = [get_apidoc]
-llm = ChatOllama(model="llama3.2", temperature=0)
-llm = llm.bind_tools(tool_belt)
+llm = chat_model.bind_tools(tool_belt)
 
 tool_node = ToolNode(tool_belt)
 
+tracer.register_gauges("model_gateway", gateway.stats)
+tracer.register_gauges("request_cache", request_cache.stats)
+tracer.serve_metrics(METRICS_PORT)
+
 def call_llm(state):
     logger.debug(f"Calling for: {state['messages']}")
     messages = state["messages"]
-    response = llm.invoke(messages)
+    with tracer.span("call_llm"):
+        response = gateway.run(lambda: llm.invoke(messages), Priority.INTERACTIVE)
+        usage = response.usage_metadata or {}
+        tracer.add_tokens("call_llm", usage.get("input_tokens", 0), usage.get("output_tokens", 0))
     return {"messages": [response]}
 
+def call_tools(state, config):
+    with tracer.span("ToolNode"):
+        return tool_node.invoke(state, config)
+
 def should_continue(state) -> Literal["continue", "end"]:
     last_message = state["messages"][-1]
     if last_message.tool_calls:
@@ -42,7 +56,7 @@ def should_continue(state) -> Literal["continue", "end"]:
 
 uncompiled_graph = StateGraph(State)
 uncompiled_graph.add_node("agent", call_llm)
-uncompiled_graph.add_node("action", tool_node)
+uncompiled_graph.add_node("action", call_tools)
 
 uncompiled_graph.add_edge(START, "agent")
 uncompiled_graph.add_conditional_edges("agent", should_continue,{"continue": "action", "end": END})
@@ -80,19 +94,29 @@ async def on_chat_start():
 async def on_message(message: cl.Message):
     compiled_graph = cl.user_session.get("compiled_graph")
     msg = cl.Message(content="")
+    # Messages starting with /profile attach sampled call stacks to this turn's spans
+    match = re.match(r"/profile(?:\s+|$)", message.content)
+    profile = match is not None
+    content = message.content[match.end():] if match else message.content
     inputs = {"messages" : [
     SystemMessage(content="You are an expert in retrieving API documentation. Use the get_apidoc tool to search the vector store, and return the formatted data from executed api endpoint."),
-    HumanMessage(content=f"{message.content}")
+    HumanMessage(content=f"{content}")
     ]}
     logger.info(f"Inputs: {inputs}")
     messages = []
+    if profile:
+        logger.info("Profiling this turn")
+        await msg.stream_token("Profiling this turn; the call stacks are written to the trace file.\n")
     await msg.stream_token("Finding the right endpoint, please wait...\n")
-    async for chunk in compiled_graph.astream(inputs, stream_mode="updates"):
-        for node, values in chunk.items():
-            logger.info(f"\nReceiving update from node: '{node}'")
-            await msg.stream_token(f"Receiving update from node: '{node}'\n")
-            logger.debug(values["messages"])
-            messages.append(values["messages"])
+    # The turn span runs on the event loop every chat session shares, so its own profile is
+    # loop-wide; the node spans below it run in executor threads and profile only this turn
+    with tracer.span("turn", profile=profile):
+        async for chunk in compiled_graph.astream(inputs, stream_mode="updates"):
+            for node, values in chunk.items():
+                logger.info(f"\nReceiving update from node: '{node}'")
+                await msg.stream_token(f"Receiving update from node: '{node}'\n")
+                logger.debug(values["messages"])
+                messages.append(values["messages"])
 
     final_llm_response = messages[-1][0].content
     final_llm_metadata = messages[-1][0].response_metadata
@@ -1 +1,22 @@
-BASE_URL = "http://127.0.0.1:8000"
\ No newline at end of file
+import os
+
+# Settings are read from the environment (app.py loads .env first), e.g. to point at the offline benchmark stand-ins
+BASE_URL = os.getenv("BASE_URL", "http://127.0.0.1:8000")
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3.2")
+OLLAMA_TIMEOUT = float(os.getenv("OLLAMA_TIMEOUT", "120"))
+# Model gateway limits: concurrent Ollama calls, callers allowed to queue, and embedding micro-batches
+OLLAMA_MAX_CONCURRENCY = int(os.getenv("OLLAMA_MAX_CONCURRENCY", "2"))
+OLLAMA_MAX_QUEUE = int(os.getenv("OLLAMA_MAX_QUEUE", "64"))
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "16"))
+EMBED_BATCH_WINDOW = float(os.getenv("EMBED_BATCH_WINDOW", "0.01"))
+# Seconds to wait on the REST API (per connect and per read) before giving up
+API_TIMEOUT = float(os.getenv("API_TIMEOUT", "30"))
+# No defaults: the Qdrant host and key must come from the environment or .env
+QDRANT_URL = os.getenv("QDRANT_URL")
+QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
+TRACE_FILE = os.getenv("TRACE_FILE", "traces.jsonl")
+# Fraction of chat turns whose spans are written to TRACE_FILE; histograms always see every span
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.1"))
+TRACE_MAX_BYTES = int(os.getenv("TRACE_MAX_BYTES", str(50 * 1024 * 1024)))
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9464"))
\ No newline at end of file
@@ -1,10 +1,13 @@
 import json
 import logging
 import requests
-from config import BASE_URL
-from langchain.llms import Ollama
+from config import API_TIMEOUT, BASE_URL
+from model_gateway import completion_model as llm, gateway
+from request_cache import RequestCache
+from tracing import tracer
 
-llm = Ollama(model="llama3.2", base_url="http://localhost:11434")
+# The leader of a shared GET may spend API_TIMEOUT connecting and again reading, so followers wait as long
+request_cache = RequestCache(wait_timeout=2 * API_TIMEOUT)
 
 def create_llm_prompt(user_query, relevant_endpoints):
     prompt_template = f"""
@@ -42,6 +45,7 @@ def create_llm_prompt(user_query, relevant_endpoints):
     """
     return prompt_template
 
+@tracer.traced()
 def generate_api_request(user_query, relevant_endpoints):
     if not relevant_endpoints:
         return None
@@ -49,8 +53,12 @@ def generate_api_request(user_query, relevant_endpoints):
     prompt_template = create_llm_prompt(user_query, relevant_endpoints)  # Get the strict JSON prompt
     formatted_prompt = f"{prompt_template}\nUser Query: {user_query}"  # Append user query manually
 
-    response = llm.invoke(formatted_prompt).strip()  # Invoke the LLM
-    print(f"LLM Response: {response}")  # Print the raw response for debugging
+    result = gateway.run(lambda: llm.generate([formatted_prompt]))  # Invoke the LLM
+    generation = result.generations[0][0]
+    info = generation.generation_info or {}
+    tracer.add_tokens("generate_api_request", info.get("prompt_eval_count", 0), info.get("eval_count", 0))
+    response = generation.text.strip()
+    logging.debug(f"LLM Response: {response}")  # Log the raw response for debugging
     try:
         response_json = response.split("Final Answer:")[-1].strip()
         api_request = json.loads(response_json)
@@ -59,32 +67,43 @@ def generate_api_request(user_query, relevant_endpoints):
         logging.error(f"Failed to parse API request: {e}")
         return None
 
+@tracer.traced()
 def execute_api_request(api_request, api_requester):
     method = api_request.get("method", "").upper()
     endpoint = api_request.get("endpoint", "")
     params = api_request.get("params", {})
     request_body = api_request.get("request_body", {})
 
+    url = f"{BASE_URL}{endpoint}"
+    span = tracer.current_span()
+    span.set("method", method)
+    span.set("endpoint", endpoint)
+
     try:
         if method == "GET":
-            response = api_requester.get(f"{BASE_URL}{endpoint}", params=params)
+            response = request_cache.get(url, params, lambda headers: api_requester.get(url, params=params, headers=headers))
         elif method == "POST":
-            response = api_requester.post(f"{BASE_URL}{endpoint}", json=request_body)
+            response = api_requester.post(url, json=request_body)
         elif method == "PUT":
-            response = api_requester.put(f"{BASE_URL}{endpoint}", json=request_body)
+            response = api_requester.put(url, json=request_body)
         elif method == "PATCH":
-            response = api_requester.patch(f"{BASE_URL}{endpoint}", json=request_body)
+            response = api_requester.patch(url, json=request_body)
         elif method == "DELETE":
-            response = api_requester.delete(f"{BASE_URL}{endpoint}", json=request_body)
+            response = api_requester.delete(url, json=request_body)
         else:
             return "Unsupported HTTP method."
 
+        span.set("status_code", response.status_code)
         response.raise_for_status()  # Check for HTTP errors (4xx or 5xx)
         return response.json()
 
-    except requests.exceptions.RequestException as e:
+    except (requests.exceptions.RequestException, TimeoutError) as e:
         logging.error(f"API request failed: {e}")
         return f"API request failed: {e}"
+    finally:
+        # A write that failed or timed out may still have reached the server
+        if method in ("POST", "PUT", "PATCH", "DELETE"):
+            request_cache.invalidate(url)
 
 def generate_natural_language_response(api_response):
     if not api_response or isinstance(api_response, str):
@@ -99,7 +118,7 @@ def generate_natural_language_response(api_response):
     Provide a clear and concise summary of the response.
     """
     try:
-        response = llm.invoke(prompt)
+        response = gateway.run(lambda: llm.invoke(prompt))
         return response
     except Exception as e:
         logging.error(f"Failed to generate natural language response: {e}")
@@ -0,0 +1,253 @@
+import time
+import heapq
+import itertools
+import threading
+import logging
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from contextlib import contextmanager
+from enum import IntEnum
+
+from config import (EMBED_BATCH_SIZE, EMBED_BATCH_WINDOW, OLLAMA_BASE_URL, OLLAMA_MAX_CONCURRENCY,
+                    OLLAMA_MAX_QUEUE, OLLAMA_MODEL, OLLAMA_TIMEOUT)
+from langchain_core.embeddings import Embeddings
+from langchain_ollama import ChatOllama, OllamaEmbeddings, OllamaLLM
+
+logger = logging.getLogger(__name__)
+
+class Priority(IntEnum):
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+class GatewayBusy(Exception):
+    """Raised when the admission queue is full."""
+
+class GatewayTimeout(Exception):
+    """Raised when a request waited longer than its timeout."""
+
+class ModelGateway:
+    """
+    Admission control in front of the shared Ollama server.
+    At most max_concurrency model calls run at once; the rest wait in a priority
+    queue (interactive before background, then arrival order) of at most max_queue
+    entries. Embedding requests for the same text share one call, and concurrent
+    embedding requests are sent to the server in micro-batches of batch_size.
+    """
+    def __init__(self, embeddings, max_concurrency=OLLAMA_MAX_CONCURRENCY, max_queue=OLLAMA_MAX_QUEUE,
+                 queue_timeout=OLLAMA_TIMEOUT, batch_size=EMBED_BATCH_SIZE, batch_window=EMBED_BATCH_WINDOW):
+        self.embeddings = embeddings
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+
+        self._cond = threading.Condition()
+        self._active = 0
+        self._waiting = []  # heap of (priority, seq)
+        self._seq = itertools.count()
+
+        self._batch_cond = threading.Condition()
+        self._pending = []  # heap of (priority, seq, text) waiting for a batch
+        self._futures = {}  # text -> Future, until the embedding is resolved
+        self._waiters = {}  # text -> number of callers waiting for it
+        self._background_batches = 0  # background batches dispatched but not finished
+        self._batcher = None
+
+        self.admitted = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.max_queue_depth = 0
+        self.wait_times = {priority.name.lower(): {"count": 0, "total": 0.0, "max": 0.0} for priority in Priority}
+        self.batches = 0
+        self.embedded = 0
+        self.coalesced = 0
+
+    def _acquire(self, priority, timeout):
+        ticket = (priority, next(self._seq))
+        start = time.monotonic()
+        deadline = start + (self.queue_timeout if timeout is None else timeout)
+        with self._cond:
+            if self._active >= self.max_concurrency or self._waiting:
+                if len(self._waiting) >= self.max_queue:
+                    self.rejected += 1
+                    raise GatewayBusy(f"Model queue is full ({len(self._waiting)} waiting)")
+                heapq.heappush(self._waiting, ticket)
+                self.max_queue_depth = max(self.max_queue_depth, len(self._waiting))
+                while self._active >= self.max_concurrency or self._waiting[0] != ticket:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._waiting.remove(ticket)
+                        heapq.heapify(self._waiting)
+                        self.timeouts += 1
+                        self._cond.notify_all()
+                        raise GatewayTimeout(f"Waited {time.monotonic() - start:.1f}s for a model slot")
+                    self._cond.wait(remaining)
+                heapq.heappop(self._waiting)
+                self._cond.notify_all()
+            self._active += 1
+            self.admitted += 1
+
+            waited = time.monotonic() - start
+            wait_time = self.wait_times[Priority(priority).name.lower()]
+            wait_time["count"] += 1
+            wait_time["total"] += waited
+            wait_time["max"] = max(wait_time["max"], waited)
+
+    def _release(self):
+        with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, priority=Priority.INTERACTIVE, timeout=None):
+        self._acquire(priority, timeout)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def run(self, fn, priority=Priority.INTERACTIVE, timeout=None):
+        """Call fn() once a model slot is free."""
+        with self.slot(priority, timeout):
+            return fn()
+
+    def embed(self, text, priority=Priority.INTERACTIVE, timeout=None):
+        return self.embed_many([text], priority, timeout)[0]
+
+    def embed_many(self, texts, priority=Priority.INTERACTIVE, timeout=None):
+        futures = [self._submit(text, priority) for text in texts]
+        deadline = time.monotonic() + (self.queue_timeout if timeout is None else timeout)
+        try:
+            return [future.result(max(deadline - time.monotonic(), 0)) for future in futures]
+        except FutureTimeout:
+            with self._cond:
+                self.timeouts += 1
+            raise GatewayTimeout(f"Timed out waiting for {len(texts)} embeddings")
+        finally:
+            self._release_texts(texts)
+
+    def _submit(self, text, priority):
+        with self._batch_cond:
+            self._waiters[text] = self._waiters.get(text, 0) + 1
+            future = self._futures.get(text)
+            if future:
+                self.coalesced += 1
+                # Let a waiting background text jump ahead when an interactive caller needs it too
+                if priority == Priority.INTERACTIVE:
+                    self._pending = [(min(p, priority) if t == text else p, s, t) for p, s, t in self._pending]
+                    heapq.heapify(self._pending)
+                return future
+
+            future = self._futures[text] = Future()
+            heapq.heappush(self._pending, (priority, next(self._seq), text))
+            if self._batcher is None:
+                self._batcher = threading.Thread(target=self._batch_loop, name="embedding-batcher", daemon=True)
+                self._batcher.start()
+            self._batch_cond.notify_all()
+            return future
+
+    def _release_texts(self, texts):
+        """Drop a caller's interest in texts; queued texts nobody waits for any more are not sent."""
+        with self._batch_cond:
+            for text in texts:
+                self._waiters[text] -= 1
+                if self._waiters[text]:
+                    continue
+                del self._waiters[text]
+                if any(t == text for _, _, t in self._pending):
+                    self._pending = [entry for entry in self._pending if entry[2] != text]
+                    heapq.heapify(self._pending)
+                    self._futures.pop(text).cancel()
+
+    def _dispatchable(self):
+        # Background batches waiting for a slot are capped, interactive ones never wait behind them
+        return self._pending and (
+            self._pending[0][0] == Priority.INTERACTIVE or self._background_batches < self.max_concurrency
+        )
+
+    def _batch_loop(self):
+        while True:
+            with self._batch_cond:
+                while not self._dispatchable():
+                    self._batch_cond.wait()
+            # Give concurrent callers a moment to join the batch
+            time.sleep(self.batch_window)
+            with self._batch_cond:
+                if not self._dispatchable():
+                    continue
+                batch = [heapq.heappop(self._pending) for _ in range(min(self.batch_size, len(self._pending)))]
+                if batch[0][0] == Priority.BACKGROUND:
+                    self._background_batches += 1
+            # Each batch waits for its own slot, so the batcher keeps forming interactive batches meanwhile
+            threading.Thread(target=self._run_batch, args=(batch,), name="embedding-batch", daemon=True).start()
+
+    def _run_batch(self, batch):
+        priority = batch[0][0]
+        texts = [text for _, _, text in batch]
+        try:
+            with self.slot(priority):
+                vectors = self.embeddings.embed_documents(texts)
+        except Exception as e:
+            logger.error(f"Embedding batch of {len(texts)} failed: {e}")
+            results = [(text, None, e) for text in texts]
+        else:
+            results = [(text, vector, None) for text, vector in zip(texts, vectors)]
+
+        with self._batch_cond:
+            if priority == Priority.BACKGROUND:
+                self._background_batches -= 1
+            if not results[0][2]:
+                self.batches += 1
+                self.embedded += len(texts)
+            futures = [(self._futures.pop(text), vector, error) for text, vector, error in results]
+            self._batch_cond.notify_all()
+        for future, vector, error in futures:
+            if error:
+                future.set_exception(error)
+            else:
+                future.set_result(vector)
+
+    def stats(self):
+        with self._cond:
+            stats = {
+                "active": self._active,
+                "queue_depth": len(self._waiting),
+                "max_queue_depth": self.max_queue_depth,
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "timeouts": self.timeouts,
+                "wait_time": {
+                    name: dict(wait_time, mean=wait_time["total"] / wait_time["count"] if wait_time["count"] else 0.0)
+                    for name, wait_time in self.wait_times.items()
+                },
+            }
+        with self._batch_cond:
+            stats["embedding"] = {
+                "pending": len(self._pending),
+                "batches": self.batches,
+                "embedded": self.embedded,
+                "coalesced": self.coalesced,
+            }
+        return stats
+
+class GatewayEmbeddings(Embeddings):
+    """Embeddings interface for vector stores that routes every call through the gateway."""
+    def __init__(self, gateway, priority=Priority.INTERACTIVE):
+        self.gateway = gateway
+        self.priority = priority
+
+    def embed_documents(self, texts):
+        return self.gateway.embed_many(texts, self.priority)
+
+    def embed_query(self, text):
+        return self.gateway.embed(text, self.priority)
+
+# Shared clients for the local Ollama server; call them through the gateway
+chat_model = ChatOllama(model=OLLAMA_MODEL, base_url=OLLAMA_BASE_URL, temperature=0,
+                        client_kwargs={"timeout": OLLAMA_TIMEOUT})
+completion_model = OllamaLLM(model=OLLAMA_MODEL, base_url=OLLAMA_BASE_URL,
+                             client_kwargs={"timeout": OLLAMA_TIMEOUT})
+embedding_model = OllamaEmbeddings(model=OLLAMA_MODEL, base_url=OLLAMA_BASE_URL,
+                                   client_kwargs={"timeout": OLLAMA_TIMEOUT})
+
+gateway = ModelGateway(embedding_model)
@@ -0,0 +1,182 @@
+import json
+import time
+import threading
+import logging
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+class _InFlight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = None
+        self.error = None
+
+class RequestCache:
+    """
+    Cache for idempotent GET responses shared by every chat session.
+    Identical GETs that are in flight at the same time share one upstream call,
+    successful responses are kept according to Cache-Control (or default_ttl) and
+    revalidated with their ETag, and any write to a resource path drops the cached
+    GETs for that path, its parents and its children. Callers sharing a call give up
+    with TimeoutError after wait_timeout seconds.
+    """
+    def __init__(self, default_ttl=30, wait_timeout=60):
+        self.default_ttl = default_ttl
+        self.wait_timeout = wait_timeout
+        self._lock = threading.Lock()
+        self._entries = {}  # key -> {"path", "response", "etag", "expires_at"}
+        self._inflight = {}  # key -> _InFlight
+        self._writes = 0  # sequence number of the latest write or clear()
+        self._written = {}  # path -> sequence number of its latest write
+        self._cleared = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.revalidated = 0
+        self.invalidations = 0
+        self.timeouts = 0
+
+    @staticmethod
+    def _related(a, b):
+        """True when one path is the other, or a parent collection or sub-resource of it."""
+        return a == b or a.startswith(b + "/") or b.startswith(a + "/")
+
+    @staticmethod
+    def _key(url, params):
+        return url, json.dumps(params or {}, sort_keys=True, default=str)
+
+    def _freshness(self, response):
+        """Return how long a response may be reused, or None if it must not be stored."""
+        directives = {}
+        for directive in response.headers.get("Cache-Control", "").split(","):
+            name, _, value = directive.strip().partition("=")
+            if name:
+                directives[name.lower()] = value.strip('"')
+
+        # The cache is shared between sessions, so private responses are not stored either
+        if "no-store" in directives or "private" in directives:
+            return None
+        if "no-cache" in directives:
+            return 0
+        if "max-age" in directives:
+            try:
+                return max(int(directives["max-age"]), 0)
+            except ValueError:
+                return 0
+        return self.default_ttl
+
+    def get(self, url, params, fetch):
+        """
+        Return the response for GET url with params.
+        fetch(headers) performs the upstream request; headers carries If-None-Match
+        when a stale entry is being revalidated.
+        """
+        key = self._key(url, params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry["expires_at"] > time.monotonic():
+                self.hits += 1
+                return entry["response"]
+
+            call = self._inflight.get(key)
+            if call:
+                self.coalesced += 1
+                leader = False
+            else:
+                self.misses += 1
+                call = self._inflight[key] = _InFlight()
+                leader = True
+                started = self._writes
+
+        if not leader:
+            if not call.done.wait(self.wait_timeout):
+                with self._lock:
+                    self.timeouts += 1
+                raise TimeoutError(f"Waited {self.wait_timeout}s for the shared GET {url}")
+            if call.error:
+                raise call.error
+            return call.response
+
+        try:
+            call.response = self._fetch(key, url, entry, started, fetch)
+            return call.response
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+                # Writes only matter to GETs in flight when they happened
+                if not self._inflight:
+                    self._written.clear()
+            call.done.set()
+
+    def _stale_since(self, path, started):
+        if self._cleared > started:
+            return True
+        return any(seq > started and self._related(path, written) for written, seq in self._written.items())
+
+    def _fetch(self, key, url, entry, started, fetch):
+        headers = {}
+        if entry and entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        response = fetch(headers)
+        ttl = self._freshness(response)
+
+        if response.status_code == 304 and entry:
+            with self._lock:
+                self.revalidated += 1
+            logger.debug(f"Revalidated cached response for {url}")
+            # A 304 may refresh the caching headers; otherwise the stored ones still apply
+            if "Cache-Control" not in response.headers:
+                ttl = self._freshness(entry["response"])
+            response, etag = entry["response"], entry["etag"]
+        elif 200 <= response.status_code < 300:
+            etag = response.headers.get("ETag")
+        else:
+            return response
+
+        path = urlsplit(url).path.rstrip("/")
+        with self._lock:
+            # A write to this path, a parent or a sub-resource while the request was in flight makes the response stale
+            if ttl is None or self._stale_since(path, started):
+                self._entries.pop(key, None)
+            else:
+                self._entries[key] = {
+                    "path": path,
+                    "response": response,
+                    "etag": etag,
+                    "expires_at": time.monotonic() + ttl,
+                }
+        return response
+
+    def invalidate(self, url):
+        """Drop cached GETs for the path of url, its parent collections and its sub-resources."""
+        path = urlsplit(url).path.rstrip("/")
+        with self._lock:
+            self._writes += 1
+            self._written[path] = self._writes
+            stale = [key for key, entry in self._entries.items() if self._related(entry["path"], path)]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._writes += 1
+            self._cleared = self._writes
+            self._written.clear()
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "revalidated": self.revalidated,
+                "invalidations": self.invalidations,
+                "timeouts": self.timeouts,
+                "entries": len(self._entries),
+            }
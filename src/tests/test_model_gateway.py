@@ -0,0 +1,139 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("langchain_core")
+pytest.importorskip("langchain_ollama")
+
+from model_gateway import GatewayBusy, GatewayTimeout, ModelGateway, Priority
+
+class FakeEmbeddings:
+    """Records every batch it is asked for and returns one-element vectors."""
+    def __init__(self, delay=0.0, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.batches = []
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        with self._lock:
+            self.batches.append(list(texts))
+        time.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError("model server down")
+        return [[float(len(text))] for text in texts]
+
+def _start(target, *args):
+    thread = threading.Thread(target=target, args=args)
+    thread.start()
+    return thread
+
+def _wait_for_queue(gateway, depth):
+    deadline = time.monotonic() + 2
+    while gateway.stats()["queue_depth"] < depth:
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+def test_interactive_waiters_run_before_background():
+    gateway = ModelGateway(FakeEmbeddings(), max_concurrency=1, queue_timeout=2)
+    release = threading.Event()
+    order = []
+
+    holder = _start(gateway.run, release.wait)
+    _wait_for_queue(gateway, 0)
+    time.sleep(0.05)
+    threads = []
+    for name, priority in (("background-1", Priority.BACKGROUND), ("background-2", Priority.BACKGROUND),
+                           ("interactive", Priority.INTERACTIVE)):
+        threads.append(_start(gateway.run, lambda name=name: order.append(name), priority))
+        _wait_for_queue(gateway, len(threads))
+    release.set()
+    for thread in [holder] + threads:
+        thread.join()
+
+    assert order == ["interactive", "background-1", "background-2"]
+    assert gateway.stats()["max_queue_depth"] == 3
+
+def test_full_queue_raises_gateway_busy():
+    gateway = ModelGateway(FakeEmbeddings(), max_concurrency=1, max_queue=1, queue_timeout=2)
+    release = threading.Event()
+    holder = _start(gateway.run, release.wait)
+    time.sleep(0.05)
+    waiter = _start(gateway.run, lambda: None)
+    _wait_for_queue(gateway, 1)
+
+    with pytest.raises(GatewayBusy):
+        gateway.run(lambda: None)
+    release.set()
+    holder.join()
+    waiter.join()
+    assert gateway.stats()["rejected"] == 1
+
+def test_long_wait_raises_gateway_timeout_and_leaves_the_queue():
+    gateway = ModelGateway(FakeEmbeddings(), max_concurrency=1, queue_timeout=2)
+    release = threading.Event()
+    holder = _start(gateway.run, release.wait)
+    time.sleep(0.05)
+
+    with pytest.raises(GatewayTimeout):
+        gateway.run(lambda: None, timeout=0.1)
+    assert gateway.stats()["queue_depth"] == 0
+    release.set()
+    holder.join()
+    assert gateway.run(lambda: "free") == "free"
+
+def test_identical_texts_share_one_embedding():
+    embeddings = FakeEmbeddings(delay=0.05)
+    gateway = ModelGateway(embeddings, batch_window=0.05)
+    results = []
+    threads = [_start(lambda: results.append(gateway.embed("same query"))) for _ in range(5)]
+    for thread in threads:
+        thread.join()
+
+    assert embeddings.batches == [["same query"]]
+    assert results == [[10.0]] * 5
+    assert gateway.stats()["embedding"]["coalesced"] == 4
+
+def test_concurrent_texts_are_sent_in_micro_batches():
+    embeddings = FakeEmbeddings()
+    gateway = ModelGateway(embeddings, batch_size=4, batch_window=0.05)
+    texts = [f"text {i}" for i in range(10)]
+
+    assert gateway.embed_many(texts) == [[float(len(text))] for text in texts]
+    assert sorted(len(batch) for batch in embeddings.batches) == [2, 4, 4]
+    assert gateway.stats()["embedding"]["embedded"] == 10
+
+def test_interactive_embedding_is_not_stuck_behind_background_batches():
+    embeddings = FakeEmbeddings(delay=0.01)
+    gateway = ModelGateway(embeddings, max_concurrency=2, batch_size=4, queue_timeout=3)
+    stop = threading.Event()
+
+    def chat_loop():
+        while not stop.is_set():
+            gateway.run(lambda: time.sleep(0.02), Priority.INTERACTIVE)
+
+    chats = [_start(chat_loop) for _ in range(4)]
+    indexing = _start(gateway.embed_many, [f"endpoint {i}" for i in range(40)], Priority.BACKGROUND)
+    time.sleep(0.1)
+    try:
+        start = time.monotonic()
+        assert gateway.embed("user query", Priority.INTERACTIVE) == [10.0]
+        assert time.monotonic() - start < 1
+    finally:
+        stop.set()
+        for thread in chats:
+            thread.join()
+        indexing.join()
+
+def test_failed_batch_drops_the_callers_queued_texts():
+    embeddings = FakeEmbeddings(fail=True)
+    gateway = ModelGateway(embeddings, max_concurrency=1, batch_size=2, batch_window=0.01)
+
+    with pytest.raises(ConnectionError):
+        gateway.embed_many([f"text {i}" for i in range(20)], Priority.BACKGROUND)
+    time.sleep(0.2)
+
+    # Only the batches already dispatched when the first one failed reached the model
+    assert len(embeddings.batches) < 10
+    assert gateway.stats()["embedding"]["pending"] == 0
@@ -0,0 +1,167 @@
+import threading
+import time
+
+import pytest
+
+from request_cache import RequestCache
+
+URL = "http://api/client-engagements"
+
+class FakeResponse:
+    def __init__(self, status_code=200, headers=None, body=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.body = body
+
+class FakeBackend:
+    """Hands out the queued responses in order and records the headers of each call."""
+    def __init__(self, *responses, delay=0.0):
+        self.responses = list(responses)
+        self.delay = delay
+        self.calls = []
+
+    def __call__(self, headers):
+        self.calls.append(headers)
+        time.sleep(self.delay)
+        return self.responses.pop(0) if len(self.responses) > 1 else self.responses[0]
+
+def test_identical_gets_in_flight_share_one_call():
+    cache = RequestCache()
+    backend = FakeBackend(FakeResponse(body="shared"), delay=0.1)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get(URL, {}, backend))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(backend.calls) == 1
+    assert [response.body for response in results] == ["shared"] * 5
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["coalesced"] == 4
+
+def test_leader_error_reaches_coalesced_callers():
+    cache = RequestCache()
+    def failing(headers):
+        time.sleep(0.1)
+        raise ConnectionError("backend down")
+    errors = []
+    def call():
+        try:
+            cache.get(URL, {}, failing)
+        except ConnectionError as e:
+            errors.append(e)
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(errors) == 3
+    assert cache.stats()["entries"] == 0
+
+def test_coalesced_caller_gives_up_on_a_hung_leader():
+    cache = RequestCache(wait_timeout=0.05)
+    started = threading.Event()
+    release = threading.Event()
+    def hung(headers):
+        started.set()
+        release.wait()
+        return FakeResponse(body="late")
+    leader = threading.Thread(target=cache.get, args=(URL, {}, hung))
+    leader.start()
+    started.wait()
+
+    try:
+        with pytest.raises(TimeoutError):
+            cache.get(URL, {}, hung)
+    finally:
+        release.set()
+        leader.join()
+    assert cache.stats()["timeouts"] == 1
+    assert cache.get(URL, {}, hung).body == "late"
+
+def test_fresh_response_is_served_from_cache():
+    cache = RequestCache()
+    backend = FakeBackend(FakeResponse(headers={"Cache-Control": "max-age=60"}))
+    cache.get(URL, {"page": 1}, backend)
+    cache.get(URL, {"page": 1}, backend)
+    cache.get(URL, {"page": 2}, backend)
+
+    assert len(backend.calls) == 2
+    assert cache.stats()["hits"] == 1
+
+def test_expired_response_is_fetched_again():
+    cache = RequestCache(default_ttl=0.05)
+    backend = FakeBackend(FakeResponse())
+    cache.get(URL, {}, backend)
+    time.sleep(0.1)
+    cache.get(URL, {}, backend)
+
+    assert len(backend.calls) == 2
+
+def test_no_store_and_private_responses_are_not_cached():
+    for cache_control in ("no-store", "private, max-age=60"):
+        cache = RequestCache()
+        backend = FakeBackend(FakeResponse(headers={"Cache-Control": cache_control}))
+        cache.get(URL, {}, backend)
+        cache.get(URL, {}, backend)
+
+        assert len(backend.calls) == 2
+        assert cache.stats()["entries"] == 0
+
+def test_error_responses_are_not_cached():
+    cache = RequestCache()
+    backend = FakeBackend(FakeResponse(status_code=500), FakeResponse(body="ok"))
+    assert cache.get(URL, {}, backend).status_code == 500
+    assert cache.get(URL, {}, backend).body == "ok"
+
+def test_stale_entry_is_revalidated_with_etag():
+    cache = RequestCache()
+    backend = FakeBackend(
+        FakeResponse(headers={"ETag": '"v1"', "Cache-Control": "no-cache"}, body="cached"),
+        FakeResponse(status_code=304),
+    )
+    cache.get(URL, {}, backend)
+    response = cache.get(URL, {}, backend)
+
+    assert backend.calls[1] == {"If-None-Match": '"v1"'}
+    assert response.body == "cached"
+    assert cache.stats()["revalidated"] == 1
+
+def test_write_invalidates_path_parent_and_children():
+    cache = RequestCache()
+    backend = FakeBackend(FakeResponse())
+    cache.get(URL, {}, backend)
+    cache.get(f"{URL}/1", {}, backend)
+    cache.get(f"{URL}/1/notes", {}, backend)
+    cache.get(f"{URL}/2", {}, backend)
+
+    cache.invalidate(f"{URL}/1")
+
+    assert cache.stats()["invalidations"] == 3
+    assert cache.stats()["entries"] == 1
+    cache.get(f"{URL}/2", {}, backend)
+    assert cache.stats()["hits"] == 1
+
+def test_write_during_flight_drops_only_related_responses():
+    cache = RequestCache()
+    started = threading.Event()
+    release = threading.Event()
+    def slow(headers):
+        started.set()
+        release.wait()
+        return FakeResponse()
+
+    # A sub-resource of the written path is dropped, an unrelated path is still stored
+    for url, entries in ((f"{URL}/1", 0), ("http://api/other", 1)):
+        started.clear()
+        release.clear()
+        thread = threading.Thread(target=cache.get, args=(url, {}, slow))
+        thread.start()
+        started.wait()
+        cache.invalidate(URL)
+        release.set()
+        thread.join()
+
+        assert cache.stats()["entries"] == entries
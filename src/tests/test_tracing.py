@@ -0,0 +1,89 @@
+import json
+
+from tracing import JsonLinesExporter, Tracer
+
+def _read(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+def test_nested_spans_share_the_trace_and_are_exported(tmp_path):
+    exporter = JsonLinesExporter(str(tmp_path / "traces.jsonl"))
+    tracer = Tracer(exporters=[exporter], sample_rate=1.0)
+    with tracer.span("turn") as turn:
+        with tracer.span("call_llm"):
+            tracer.add_tokens("call_llm", 10, 5)
+    exporter.flush()
+
+    spans = {span["name"]: span for span in _read(tmp_path / "traces.jsonl")}
+    assert spans["call_llm"]["trace_id"] == turn.trace_id
+    assert spans["call_llm"]["parent_id"] == turn.span_id
+    assert spans["call_llm"]["attributes"] == {"input_tokens": 10, "output_tokens": 5}
+    assert tracer.histograms["turn"].count == 1
+
+def test_unsampled_traces_feed_histograms_but_are_not_exported(tmp_path):
+    exporter = JsonLinesExporter(str(tmp_path / "traces.jsonl"))
+    tracer = Tracer(exporters=[exporter], sample_rate=0.0)
+    with tracer.span("turn"):
+        with tracer.span("call_llm") as child:
+            assert not child.sampled
+    exporter.flush()
+
+    assert not (tmp_path / "traces.jsonl").exists()
+    assert tracer.histograms["call_llm"].count == 1
+
+def test_profiled_turns_are_always_exported(tmp_path):
+    exporter = JsonLinesExporter(str(tmp_path / "traces.jsonl"))
+    tracer = Tracer(exporters=[exporter], sample_rate=0.0)
+    with tracer.span("turn", profile=True):
+        sum(range(100000))
+    exporter.flush()
+
+    [span] = _read(tmp_path / "traces.jsonl")
+    assert "profile" in span["attributes"]
+
+def test_exporter_rotates_past_max_bytes(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    exporter = JsonLinesExporter(str(path), max_bytes=10)
+    tracer = Tracer(exporters=[exporter])
+    with tracer.span("first"):
+        pass
+    exporter.flush()
+    with tracer.span("second"):
+        pass
+    exporter.flush()
+
+    assert [span["name"] for span in _read(path)] == ["second"]
+    assert [span["name"] for span in _read(tmp_path / "traces.jsonl.1")] == ["first"]
+
+def test_prometheus_output_includes_histograms_and_gauges():
+    tracer = Tracer()
+    tracer.register_gauges("model_gateway", lambda: {"queue_depth": 3, "wait_time": {"interactive": {"max": 0.5}}})
+    with tracer.span("vector_search"):
+        pass
+
+    text = tracer.prometheus()
+    assert 'span_duration_seconds_count{span="vector_search"} 1' in text
+    assert "model_gateway_queue_depth 3" in text
+    assert "model_gateway_wait_time_interactive_max 0.5" in text
+
+def test_prometheus_escapes_label_values():
+    tracer = Tracer()
+    with tracer.span('http GET /a"b\\c\nd'):
+        pass
+
+    assert 'span="http GET /a\\"b\\\\c\\nd"' in tracer.prometheus()
+
+def test_spans_join_a_remote_parent_from_headers(tmp_path):
+    exporter = JsonLinesExporter(str(tmp_path / "traces.jsonl"))
+    tracer = Tracer(exporters=[exporter], sample_rate=0.0)
+    parent = tracer.extract({"X-Trace-Id": "abc", "X-Parent-Span-Id": "def", "X-Trace-Sampled": "1"})
+    with tracer.span("http", parent=parent) as span:
+        with tracer.span("db SELECT"):
+            pass
+        span.name = "http GET /items"
+    exporter.flush()
+
+    spans = {span["name"]: span for span in _read(tmp_path / "traces.jsonl")}
+    assert spans["http GET /items"]["trace_id"] == "abc"
+    assert spans["http GET /items"]["parent_id"] == "def"
+    assert spans["db SELECT"]["parent_id"] == spans["http GET /items"]["span_id"]
+    assert tracer.extract({}) is None
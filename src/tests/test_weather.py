@@ -0,0 +1,59 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("openmeteo_requests")
+pytest.importorskip("requests_cache")
+pytest.importorskip("retry_requests")
+pytest.importorskip("langchain_core")
+
+import weather
+from weather import WEATHER_COLUMNS, summarize_weather, weather_dtype, weather_window
+
+START = 1735689600  # 2025-01-01 00:00 UTC
+
+def _forecast(hours=168):
+    records = np.zeros(hours, dtype=weather_dtype)
+    records["offset"] = np.arange(hours) * 3600
+    for i, name in enumerate(WEATHER_COLUMNS):
+        records[name] = np.arange(hours) + i
+    return {"start": START, "interval": 3600, "records": records}
+
+def test_weather_window_is_a_view_of_the_forecast():
+    forecast = _forecast()
+    window = weather_window(forecast, 5, 23)
+
+    assert len(window["records"]) == 18
+    assert np.shares_memory(window["records"], forecast["records"])
+    assert window["records"]["offset"][0] == 5 * 3600
+    assert window["start"] == forecast["start"]
+
+def test_weather_window_stops_at_the_end_of_the_forecast():
+    forecast = _forecast(hours=10)
+
+    assert len(weather_window(forecast, 8, 20)["records"]) == 2
+    assert len(weather_window(forecast, 10)["records"]) == 0
+    assert len(weather_window(forecast)["records"]) == 10
+
+def test_summarize_weather_renders_one_row_per_hour():
+    forecast = _forecast(hours=2)
+    forecast["records"]["showers"] = 0.25
+    lines = summarize_weather(forecast).splitlines()
+
+    assert lines[0] == "time(UTC)|temp(F)|humidity(%)|dew(F)|feels(F)|showers(mm)|visibility(m)|wind(m/s)"
+    assert lines[1:] == ["01-01 00:00|0|1|2|3|0.2|5|6.0", "01-01 01:00|1|2|3|4|0.2|6|7.0"]
+
+def test_summarize_weather_without_records():
+    assert summarize_weather(_forecast(hours=0)) == "No weather data available."
+
+@pytest.mark.parametrize("start_hour, hours", [(-1, 18), (5, 0), (5, -3), (168, 1)])
+def test_get_weather_rejects_windows_outside_the_forecast(monkeypatch, start_hour, hours):
+    monkeypatch.setattr(weather, "fetch_weather", lambda lat, lon: _forecast())
+    result = weather.get_weather.invoke({"lat": 0.0, "lon": 0.0, "start_hour": start_hour, "hours": hours})
+
+    assert result.startswith("Invalid forecast window")
+
+def test_get_weather_cuts_windows_short_at_the_end_of_the_forecast(monkeypatch):
+    monkeypatch.setattr(weather, "fetch_weather", lambda lat, lon: _forecast())
+    result = weather.get_weather.invoke({"lat": 0.0, "lon": 0.0, "start_hour": 160, "hours": 24})
+
+    assert len(result.splitlines()) == 1 + 8
@@ -0,0 +1,318 @@
+import os
+import sys
+import json
+import queue
+import time
+import uuid
+import random
+import threading
+import functools
+import contextvars
+import logging
+from collections import Counter, namedtuple
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config import TRACE_FILE, TRACE_MAX_BYTES, TRACE_SAMPLE_RATE
+
+logger = logging.getLogger(__name__)
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+# Latency buckets in seconds, from a Qdrant lookup up to a slow LLM generation
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Parent span from another process, e.g. the X-Trace-* headers the assistant sends to the API
+RemoteSpan = namedtuple("RemoteSpan", "trace_id span_id sampled profile thread_id", defaults=(False, None))
+
+class Span:
+    def __init__(self, name, trace_id, parent_id, sampled, profile, attributes):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.profile = profile
+        self.thread_id = threading.get_ident()
+        self.attributes = dict(attributes)
+        self.start = time.time()
+        self.duration = None
+
+    def set(self, key, value):
+        self.attributes[key] = value
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start,
+            "duration": self.duration,
+            "attributes": self.attributes,
+        }
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+class JsonLinesExporter:
+    """
+    Append finished spans as one JSON object per line.
+    Spans are buffered and written by a background thread, so callers never wait on
+    disk; the file is rotated to <path>.1 once it grows past max_bytes, and spans are
+    dropped (and counted) if the buffer of max_pending fills up.
+    """
+    def __init__(self, path, max_bytes=TRACE_MAX_BYTES, max_pending=10000):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def export(self, span):
+        # The writer starts with the first span, so an exporter that never sees one costs no thread
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                    self._thread.start()
+        try:
+            self._queue.put_nowait(span.to_dict())
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self):
+        """Block until every span exported so far is on disk."""
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            records = [self._queue.get()]
+            while len(records) < 1000:
+                try:
+                    records.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                if os.path.exists(self.path) and os.path.getsize(self.path) > self.max_bytes:
+                    os.replace(self.path, self.path + ".1")
+                with open(self.path, "a") as f:
+                    f.write("".join(json.dumps(record, default=str) + "\n" for record in records))
+            except OSError as e:
+                logger.error(f"Failed to write {len(records)} spans to {self.path}: {e}")
+            finally:
+                for _ in records:
+                    self._queue.task_done()
+
+class SamplingProfiler:
+    """Periodically sample the call stack of one thread and count where it spends time."""
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None and len(stack) < 8:
+                code = frame.f_code
+                stack.append(f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}:{frame.f_lineno}")
+                frame = frame.f_back
+            self.samples[" <- ".join(stack)] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def top(self, n=10):
+        return [{"stack": stack, "samples": count} for stack, count in self.samples.most_common(n)]
+
+class Tracer:
+    """
+    Nested timing spans for the chat pipeline.
+    Every span feeds a latency histogram by name; sampled traces are also written
+    to the exporters. Token counts and other counters are kept alongside, and
+    stats callables (e.g. the model gateway's) can be registered as gauges.
+    """
+    def __init__(self, exporters=(), sample_rate=1.0, buckets=DEFAULT_BUCKETS):
+        self.exporters = list(exporters)
+        self.sample_rate = sample_rate
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self.histograms = {}
+        self.counters = Counter()
+        self._gauges = {}
+
+    def current_span(self):
+        return _current_span.get()
+
+    def extract(self, headers):
+        """Return the RemoteSpan described by X-Trace-Id / X-Parent-Span-Id / X-Trace-Sampled headers, if any."""
+        trace_id = headers.get("X-Trace-Id")
+        if not trace_id:
+            return None
+        sampled = headers.get("X-Trace-Sampled")
+        return RemoteSpan(trace_id, headers.get("X-Parent-Span-Id"),
+                          sampled == "1" if sampled is not None else random.random() < self.sample_rate)
+
+    @contextmanager
+    def span(self, name, profile=False, parent=None, **attributes):
+        """
+        Time the block as a child of the current span (or of parent, e.g. a RemoteSpan).
+        profile=True attaches sampled stacks of the calling thread and always exports the
+        trace; child spans that run on another thread (e.g. graph nodes in an executor)
+        profile that thread as well. The name may be changed until the block exits.
+        """
+        parent = parent or _current_span.get()
+        if parent:
+            trace_id, parent_id, sampled = parent.trace_id, parent.span_id, parent.sampled
+            profile = profile or parent.profile
+        else:
+            trace_id, parent_id, sampled = uuid.uuid4().hex, None, profile or random.random() < self.sample_rate
+        span = Span(name, trace_id, parent_id, sampled, profile, attributes)
+        token = _current_span.set(span)
+
+        profiler = None
+        if profile and not (parent and parent.profile and parent.thread_id == span.thread_id):
+            profiler = SamplingProfiler(threading.get_ident())
+            profiler.start()
+
+        start = time.perf_counter()
+        try:
+            yield span
+        except Exception as e:
+            span.set("error", repr(e))
+            raise
+        finally:
+            span.duration = time.perf_counter() - start
+            _current_span.reset(token)
+            if profiler:
+                profiler.stop()
+                span.set("profile", profiler.top())
+            self._finish(span)
+
+    def traced(self, name=None):
+        """Decorator form of span()."""
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.span(name or fn.__name__):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def _finish(self, span):
+        with self._lock:
+            histogram = self.histograms.get(span.name)
+            if histogram is None:
+                histogram = self.histograms[span.name] = Histogram(self.buckets)
+            histogram.observe(span.duration)
+        if not span.sampled:
+            return
+        for exporter in self.exporters:
+            try:
+                exporter.export(span)
+            except Exception as e:
+                logger.error(f"Failed to export span {span.name}: {e}")
+
+    def add_tokens(self, name, input_tokens=0, output_tokens=0):
+        """Count tokens for a model call and record them on the current span."""
+        with self._lock:
+            self.counters[(name, "input")] += input_tokens
+            self.counters[(name, "output")] += output_tokens
+        span = _current_span.get()
+        if span:
+            span.set("input_tokens", input_tokens)
+            span.set("output_tokens", output_tokens)
+
+    def register_gauges(self, prefix, stats):
+        """Expose the numeric values of stats() (nested dicts are flattened) as gauges."""
+        self._gauges[prefix] = stats
+
+    def prometheus(self):
+        """Render histograms, token counters and gauges in the Prometheus text format."""
+        lines = [
+            "# HELP span_duration_seconds Span latency by name",
+            "# TYPE span_duration_seconds histogram",
+        ]
+        with self._lock:
+            for name, histogram in sorted(self.histograms.items()):
+                name = _escape(name)
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'span_duration_seconds_bucket{{span="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'span_duration_seconds_bucket{{span="{name}",le="+Inf"}} {histogram.count}')
+                lines.append(f'span_duration_seconds_sum{{span="{name}"}} {histogram.sum}')
+                lines.append(f'span_duration_seconds_count{{span="{name}"}} {histogram.count}')
+
+            lines.append("# TYPE llm_tokens_total counter")
+            for (name, kind), count in sorted(self.counters.items()):
+                lines.append(f'llm_tokens_total{{span="{_escape(name)}",kind="{kind}"}} {count}')
+
+        for prefix, stats in self._gauges.items():
+            for key, value in _flatten(stats()):
+                lines.append(f"{prefix}_{key} {value}")
+        return "\n".join(lines) + "\n"
+
+    def serve_metrics(self, port):
+        """Serve prometheus() on http://localhost:<port>/metrics from a background thread."""
+        tracer = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = tracer.prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        try:
+            server = ThreadingHTTPServer(("127.0.0.1", port), MetricsHandler)
+        except OSError as e:
+            logger.warning(f"Metrics server not started on port {port}: {e}")
+            return None
+        threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+        logger.info(f"Serving metrics on http://127.0.0.1:{port}/metrics")
+        return server
+
+def _escape(label):
+    """Escape a Prometheus label value."""
+    return str(label).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _flatten(stats, prefix=""):
+    for key, value in stats.items():
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{prefix}{key}_")
+        elif isinstance(value, (int, float)):
+            yield f"{prefix}{key}", value
+
+tracer = Tracer(exporters=[JsonLinesExporter(TRACE_FILE)], sample_rate=TRACE_SAMPLE_RATE)
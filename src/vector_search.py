@@ -2,11 +2,11 @@ import os
 import logging
 import requests
 from langchain.docstore.document import Document
-from langchain.embeddings import OllamaEmbeddings
 from langchain.vectorstores import Chroma
+from model_gateway import GatewayEmbeddings, Priority, gateway
 
 # Load the embedding model
-embeddings = OllamaEmbeddings(model="llama3.2", base_url="http://localhost:11434")
+embeddings = GatewayEmbeddings(gateway, Priority.BACKGROUND)
 openapi_spec_path = "http://127.0.0.1:8000/openapi.json"
 
 # Set up logging configuration
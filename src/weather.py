@@ -2,11 +2,12 @@
 from dotenv import load_dotenv
 from langchain_core.tools import tool
 from typing_extensions import TypedDict
-from typing import Literal, Annotated
+from typing import Optional
+from datetime import datetime, timezone
 import openmeteo_requests
 
 import requests_cache
-import pandas as pd
+import numpy as np
 from retry_requests import retry
 
 import logging
@@ -28,53 +29,84 @@ weather_params = {
 	"wind_speed_unit": "ms"
 }
 
+# Column name -> position of the variable in weather_params["hourly"]
+WEATHER_COLUMNS = {
+    "temperature": 0,
+    "relative_humidity": 1,
+    "dew": 2,
+    "apparent_temperature": 3,
+    "showers": 4,
+    "visibility": 5,
+    "wind_speed": 6,
+}
+
+# One record per hour: seconds since WeatherData["start"] followed by the float32 readings
+weather_dtype = np.dtype([("offset", np.int32)] + [(name, np.float32) for name in WEATHER_COLUMNS])
+
 class WeatherData(TypedDict):
-    time: Annotated[list,pd.Timestamp]
-    temperature: Annotated[list,float]
-    relative_humidity: Annotated[list,float]
-    showers: Annotated[list,float]
-    dew: Annotated[list,float]
-    apparent_temperature: Annotated[list,float]
-    visibility: Annotated[list,float]
+    start: int
+    interval: int
+    records: np.ndarray
 
-@tool
-def get_weather(lat: float, lon: float) -> WeatherData:
-    """Tool that returns the real-time weather updates for a given latitude and longitude"""
+def fetch_weather(lat: float, lon: float) -> WeatherData:
+    """Fetch the hourly forecast as a single structured array of weather_dtype records"""
     logger.info(f"Getting weather for {lat} - {lon}")
     weather_params["latitude"] = lat
     weather_params["longitude"] = lon
     responses = openmeteo.weather_api(url, params=weather_params)[0]
 
     hourly = responses.Hourly()
-    hourly_temperature_2m = hourly.Variables(0).ValuesAsNumpy()
-    hourly_relative_humidity_2m = hourly.Variables(1).ValuesAsNumpy()
-    hourly_dew_point_2m = hourly.Variables(2).ValuesAsNumpy()
-    hourly_apparent_temperature = hourly.Variables(3).ValuesAsNumpy()
-    hourly_showers = hourly.Variables(4).ValuesAsNumpy()
-    hourly_visibility = hourly.Variables(5).ValuesAsNumpy()
-    hourly_wind_speed_10m = hourly.Variables(6).ValuesAsNumpy()
-
-    hourly_data = {"date": pd.date_range(
-	start = pd.to_datetime(hourly.Time(), unit = "s", utc = True),
-	end = pd.to_datetime(hourly.TimeEnd(), unit = "s", utc = True),
-	freq = pd.Timedelta(seconds = hourly.Interval()),
-	inclusive = "left"
-    ).strftime("%Y-%m-%d %H:%M:%S")}
-    
-    weatherInfo: WeatherData = {
-        "time": hourly_data["date"][5:23],
-        "temperature": hourly_temperature_2m[5:23],
-        "relative_humidity": hourly_relative_humidity_2m[5:23],
-        "dew": hourly_dew_point_2m[5:23],
-        "apparent_temperature": hourly_apparent_temperature[5:23],
-        "showers": hourly_showers[5:23],
-        "wind_speed": hourly_wind_speed_10m[5:23],
-        "visibility": hourly_visibility[5:23]
-    }
-
-    return weatherInfo
+    interval = hourly.Interval()
+    count = (hourly.TimeEnd() - hourly.Time()) // interval
+
+    records = np.empty(count, dtype=weather_dtype)
+    records["offset"] = np.arange(count, dtype=np.int32) * interval
+    for name, index in WEATHER_COLUMNS.items():
+        records[name] = hourly.Variables(index).ValuesAsNumpy()[:count]
+
+    return {"start": hourly.Time(), "interval": interval, "records": records}
+
+def weather_window(weather: WeatherData, start: int = 0, stop: Optional[int] = None) -> WeatherData:
+    """Return hours [start, stop) of the forecast; the records are a view, not a copy"""
+    # Offsets stay relative to weather["start"], so the window shares it unchanged
+    return {"start": weather["start"], "interval": weather["interval"], "records": weather["records"][start:stop]}
+
+def summarize_weather(weather: WeatherData) -> str:
+    """Render the forecast as a compact pipe-separated table for the LLM"""
+    records = weather["records"]
+    if not len(records):
+        return "No weather data available."
+
+    lines = [
+        "time(UTC)|temp(F)|humidity(%)|dew(F)|feels(F)|showers(mm)|visibility(m)|wind(m/s)"
+    ]
+    for record in records:
+        time = datetime.fromtimestamp(weather["start"] + int(record["offset"]), tz=timezone.utc)
+        lines.append("|".join([
+            time.strftime("%m-%d %H:%M"),
+            f"{record['temperature']:.0f}",
+            f"{record['relative_humidity']:.0f}",
+            f"{record['dew']:.0f}",
+            f"{record['apparent_temperature']:.0f}",
+            f"{record['showers']:.1f}",
+            f"{record['visibility']:.0f}",
+            f"{record['wind_speed']:.1f}",
+        ]))
+    return "\n".join(lines)
+
+@tool
+def get_weather(lat: float, lon: float, start_hour: int = 5, hours: int = 18) -> str:
+    """Tool that returns the real-time weather updates for a given latitude and longitude, starting start_hour hours into the forecast and covering the following number of hours"""
+    if start_hour < 0 or hours <= 0:
+        return f"Invalid forecast window: start_hour must be 0 or more and hours must be positive (got start_hour={start_hour}, hours={hours})."
+    weather = fetch_weather(lat, lon)
+    available = len(weather["records"])
+    if start_hour >= available:
+        return f"Invalid forecast window: the forecast covers {available} hours, so start_hour must be below {available} (got {start_hour})."
+    # Windows running past the end of the forecast are cut short at its last hour
+    return summarize_weather(weather_window(weather, start_hour, min(start_hour + hours, available)))
 
 
 if __name__ == "__main__":
     load_dotenv()
-    print(get_weather(37.7749, -122.4194))
\ No newline at end of file
+    print(summarize_weather(fetch_weather(37.7749, -122.4194)))
\ No newline at end of file